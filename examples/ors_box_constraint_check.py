@@ -0,0 +1,61 @@
+# ~/Code/multivarious/examples/ors_box_constraint_check.py
+# check that the box constraint factors of ors:
+#  (1) match utl.box_constraint() at interior points
+#  (2) are mirror images on the upper (u_i = +1) and lower (u_i = -1) faces
+#  (3) a random step out of the box, from either face, is not a probe
+
+import numpy as np
+from multivarious.utl import box_constraint
+from multivarious.opt.ors import _box_constraint, _step_1, _step_2, _step_3
+
+rng = np.random.default_rng(0)
+
+print("checking ors._box_constraint against utl.box_constraint at interior points ... ")
+err = 0.0
+for k in range(1000):
+    u = rng.uniform(-0.999, 0.999, 5)
+    r = 0.3 * rng.standard_normal(5)
+    aa, bb = _box_constraint(u, r)
+    AA, BB = box_constraint(u, r)
+    err = max(err, abs(aa - AA), abs(bb - BB))
+assert err < 1e-12, err
+print("... the largest difference is %.1e.  Great!  " % err)
+
+print("checking that the factors are mirror images on the faces of the box ... ")
+for k in range(1000):
+    u = rng.uniform(-0.999, 0.999, 5)
+    r = 0.3 * rng.standard_normal(5)
+    r = np.sign(r) * np.maximum(np.abs(r), 0.01) # |r_i| >> 1e-6 regularization
+    i = rng.integers(5)
+    u[i] = 1.0                              # u on the upper face ...
+    aa, bb = _box_constraint(u, r)
+    aa_m, bb_m = _box_constraint(-u, -r)    # ... and its mirror on the lower face
+    assert 0 <= aa <= 1 and 0 <= bb <= 1, (u, r, aa, bb)
+    assert np.isclose(aa, aa_m, rtol=1e-3) and np.isclose(bb, bb_m, rtol=1e-3), \
+           (u, r, aa, aa_m, bb, bb_m)
+    if r[i] > 1e-6:                         # r points out of the box
+        assert aa == 0.0 and aa_m == 0.0, (u, r, aa, aa_m)
+    else:
+        assert bb == 0.0 and bb_m == 0.0, (u, r, bb, bb_m)
+
+u = np.array([ 1.0, 0.0 ])
+r = np.array([ 0.06, 0.08 ])
+print(" u = [+1, 0], r = [+0.06, 0.08] : aa, bb = %g, %g" % _box_constraint( u, r))
+print(" u = [-1, 0], r = [-0.06, 0.08] : aa, bb = %g, %g" % _box_constraint(-u, r*[-1, 1]))
+print("... and yes, yes they are. Great!  ")
+
+print("checking that a step out of the box, from either face, is not probed ... ")
+for sgn in ( +1.0, -1.0 ):
+    u0 = sgn * np.array([ 1.0, 0.0 ])       # on the upper face, then the lower
+    r  = sgn * np.array([ 0.06, 0.08 ])     # pointing out of the box
+    r1 = np.empty(2)
+    u1 = np.empty(2)
+    u2 = np.empty(2)
+    u3 = np.empty(2)
+    d1 = _step_1(u0, r, r1, u1)
+    d2 = _step_2(u0, r1, d1, -1.0, u2)
+    f  = np.array([ 1.0, 1.0, 0.5, 1.0 ])
+    probe = _step_3(u0, r1, d1, d2, f, np.empty((0, 2)), np.empty(0), 0, u3)
+    print(" u0 = [%+g, 0] : d1 = %g, probe u3: %s" % (sgn, d1, probe))
+    assert d1 == 0.0 and np.all(u1 == u0) and not probe, (u0, d1, u1, probe)
+print("... and no, no it is not. Great!  ")
@@ -17,6 +17,9 @@ module filename (case-sensitive). Re-export all of them here so users may call:
 from .fsolve import fsolve
 from .nms import nms
 from .ors import ors
+from .ors import OrsOptions
+from .ors import OrsResult
+from .ors_multistart import ors_multistart
 from .sqp import sqp
 from .qp_solve import plane_rot
 from .qp_solve import qr_insert
@@ -28,6 +31,9 @@ __all__ = [
     "fsolve",
     "nms",
     "ors",
+    "OrsOptions",
+    "OrsResult",
+    "ors_multistart",
     "sqp",
     "qp_solve", 
 ]
@@ -3,6 +3,7 @@ ors.py
 -----------------------------------------------------------------------------
 Optimized Step Size Randomized Search Algorithm for Nonlinear Optimization
 Depends on: opt_options(), avg_cov_func(), plot_opt_surface()
+Optional:   numba ... compiles the step helpers of the main loop
 -----------------------------------------------------------------------------
 
 Nonlinear optimization with inequality constraints using Random Search
@@ -23,7 +24,7 @@ H.P. Gavin, Civil & Environmental Eng'g, Duke Univ.
 Translation from MATLAB to Python, 2025-11-24
 
 updated 2011-04-13, 2014-01-12, 2015-03-14, (pi day 03.14.15), 2015-03-26, 
-2016-04-06, 2019-02-23, 2020-01-17, 2024-04-03, 2025-11-24
+2016-04-06, 2019-02-23, 2020-01-17, 2024-04-03, 2025-11-24, 2026-10-14
 """
 
 
@@ -31,15 +32,150 @@ import numpy as np
 import matplotlib.pyplot as plt
 import time
 from datetime import datetime, timedelta
+from dataclasses import dataclass
+from typing import NamedTuple
 from numpy.linalg import norm
-from numpy.linalg import solve
 
 from multivarious.utl.avg_cov_func import avg_cov_func
-from multivarious.utl.box_constraint import box_constraint
+from multivarious.utl.avg_cov_func_batched import avg_cov_func_batched
 from multivarious.utl.plot_opt_surface import plot_opt_surface  
 from multivarious.utl.opt_options import opt_options
 from multivarious.utl.opt_report import opt_report 
 
+try:
+    from numba import njit
+except ImportError: # numba is optional ... the step helpers run as plain Python
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda fctn: fctn
+
+# descriptions of the adaptive step size updates returned by _step_size()
+STEP_TXT = ( '          none',
+             '        uphill reduction',
+             '        uphill extension',
+             '      downhill reduction',
+             '      downhill extension',
+             '             contraction' )
+
+
+@dataclass(frozen=True)
+class OrsOptions:
+    """
+    The settings of ors, decoded once from an opt_options() vector.
+
+    Attributes
+    ----------
+    msg : int
+        message level (0=quiet, 1=every 16th update, 2+=verbose) options[0]
+    tol_v : float
+        tolerance on design variables                            options[1]
+    tol_f : float
+        tolerance on objective function                          options[2]
+    tol_g : float
+        tolerance on constraints                                 options[3]
+    max_evals : int
+        max function evaluations                                 options[4]
+    penalty : float
+        penalty on constraint violations                         options[5]
+    q : float
+        exponent on constraint violations                        options[6]
+    m_max : int
+        num. function evals in mean estimate                     options[7]
+    err_F : float
+        desired coefficient of variation on mean                 options[8]
+    find_feas : bool
+        stop when solution is feasible                           options[9]
+    plot_i, plot_j : int
+        indices of the variables of the surface plot          options[10:12]
+    plot_ni, plot_nj : int
+        number of values of each variable in the surface plot options[12:14]
+    batch : bool
+        func evaluates a batch of designs, one per row           options[19]
+    single : bool
+        random search directions in single precision (float32)   options[20]
+    sobol : bool
+        quasi-random (Sobol) directions in the first iterations  options[21]
+    patience : float
+        stop after patience*n searches without improvement       options[22]
+        (after one restart of the step size), 0 to run on ...
+        a search is one pass of the random, double, and quadratic steps
+    n_memory : int
+        number of past probes kept for the quadratic fits, 0: none options[23]
+    """
+    msg: int = 1
+    tol_v: float = 1e-3
+    tol_f: float = 1e-3
+    tol_g: float = 0.0
+    max_evals: int = 1000
+    penalty: float = 10.0
+    q: float = 1.0
+    m_max: int = 1
+    err_F: float = 0.1
+    find_feas: bool = False
+    plot_i: int = 0
+    plot_j: int = 1
+    plot_ni: int = 25
+    plot_nj: int = 35
+    batch: bool = False
+    single: bool = False
+    sobol: bool = False
+    patience: float = 10.0
+    n_memory: int = 0
+
+    @classmethod
+    def from_options(cls, options=None):
+        """ OrsOptions from a (partial) vector of settings, via opt_options() """
+        options = opt_options(options)
+        return cls(msg=int(options[0]), tol_v=float(options[1]),
+                   tol_f=float(options[2]), tol_g=float(options[3]),
+                   max_evals=int(options[4]), penalty=float(options[5]),
+                   q=float(options[6]), m_max=int(options[7]),
+                   err_F=float(options[8]), find_feas=bool(options[9]),
+                   plot_i=int(options[10]), plot_j=int(options[11]),
+                   plot_ni=int(options[12]), plot_nj=int(options[13]),
+                   batch=bool(options[19]), single=bool(options[20]),
+                   sobol=bool(options[21]), patience=float(options[22]),
+                   n_memory=int(options[23]))
+
+    def as_options(self):
+        """ the opt_options() vector of these settings """
+        options = opt_options()
+        options[[0,1,2,3,4,5,6,7,8,9,10,11,12,13,19,20,21,22,23]] = [
+            self.msg, self.tol_v, self.tol_f, self.tol_g, self.max_evals,
+            self.penalty, self.q, self.m_max, self.err_F, self.find_feas,
+            self.plot_i, self.plot_j, self.plot_ni, self.plot_nj, self.batch,
+            self.single, self.sobol, self.patience, self.n_memory ]
+        return opt_options(options)
+
+
+class OrsResult(NamedTuple):
+    """
+    Results from ors ... a tuple, so  v_opt, f_opt, ... = ors(...)  still works.
+
+    Attributes
+    ----------
+    v_opt : ndarray
+        Optimal design variables
+    f_opt : float
+        Optimal objective function value
+    g_opt : ndarray
+        Constraint values at optimum
+    cvg_hst : ndarray
+        Convergence history: [v; f; max(g); function_evals; cvg_v; cvg_f]
+    iteration : int
+        Number of iterations completed
+    function_evals : int
+        Total number of function evaluations
+    """
+    v_opt: np.ndarray
+    f_opt: float
+    g_opt: np.ndarray
+    cvg_hst: np.ndarray
+    iteration: int
+    function_evals: int
+
+
 def ors(func, v_init, v_lb=None, v_ub=None, options=None, consts=None):
     """
     Optimized Random Search with inequality constraints.
@@ -49,15 +185,17 @@ def ors(func, v_init, v_lb=None, v_ub=None, options=None, consts=None):
     func : callable
         Function to optimize with signature: f, g = func(v, consts)
         Returns objective value (float) and constraint values (array)
+        If options[19] is set, func evaluates a batch of designs:
+        F, G = func(V, consts) with V (B,n), F (B,) and G (B,m)
     v_init : ndarray, shape (n,)
         Initial design variable values
     v_lb : ndarray, shape (n,), optional
         Lower bounds on design variables (default: -100*|v_init|)
     v_ub : ndarray, shape (n,), optional
         Upper bounds on design variables (default: +100*|v_init|)
-    options : ndarray or list, optional
-        Optimization settings (see opt_options.py for details):
-        options[0] = message level (0=quiet, 1+=verbose)
+    options : ndarray, list, or OrsOptions, optional
+        Optimization settings (see opt_options.py and OrsOptions for details):
+        options[0] = message level (0=quiet, 1=every 16th update, 2+=verbose)
         options[1] = tol_v - tolerance on design variables
         options[2] = tol_f - tolerance on objective function
         options[3] = tol_g - tolerance on constraints
@@ -68,11 +206,17 @@ def ors(func, v_init, v_lb=None, v_ub=None, options=None, consts=None):
         options[8] = err_F - desired coefficient of variation on mean
         options[9] = find_feas - stop when solution is feasible (1) or not (0)
         options[10:13] = surface plotting parameters
+        options[19] = batch - func evaluates a batch of designs (1) or not (0)
+        options[20] = single - random directions in single precision (1) or not (0)
+        options[21] = sobol - Sobol directions in the first iterations (1) or not (0)
+        options[22] = patience - stop after patience*n searches without improvement
+        options[23] = n_memory - past probes kept for the quadratic fits (0: none)
     consts : optional
         Additional constants passed to func(v, consts)
     
     Returns
     -------
+    OrsResult, the named tuple  (v_opt, f_opt, g_opt, cvg_hst, iteration, function_evals)
     v_opt : ndarray
         Optimal design variables
     f_opt : float
@@ -91,7 +235,7 @@ def ors(func, v_init, v_lb=None, v_ub=None, options=None, consts=None):
     BOX = 1             # use box constraints
     step_stdev = 0.200  # standard deviation of random step
     nu = 2.5            # exponent for reducing step_stdev
-    regularization = 1e-6 * np.eye(3) # regularization for matrix inversion
+    n_window = 10       # window of the 1/5 success rule, in multiples of n
     
     # handle missing arguments
     v_init = np.asarray(v_init, dtype=float).flatten()
@@ -105,33 +249,36 @@ def ors(func, v_init, v_lb=None, v_ub=None, options=None, consts=None):
     v_lb = np.asarray(v_lb, dtype=float).flatten()
     v_ub = np.asarray(v_ub, dtype=float).flatten()
     
-    if options is None:
-        options = opt_options()
+    if isinstance(options, OrsOptions):
+        opts = options
     else:
-        options = opt_options(options)
+        opts = OrsOptions.from_options(options)
+    options = opts.as_options() # the vector of settings for avg_cov_func, etc.
     
     if consts is None:
         consts = 1.0
     
     # extract options
-    msg   = int(options[0])
-    tol_v = options[1]
-    tol_f = options[2]
-    tol_g = options[3]
-    max_evals = int(options[4])
-    penalty = options[5]
-    q = options[6]
-    find_feas = int(options[9])
+    msg   = opts.msg
+    tol_v = opts.tol_v
+    tol_f = opts.tol_f
+    tol_g = opts.tol_g
+    max_evals = opts.max_evals
+    find_feas = opts.find_feas
+    batch = opts.batch
+    r_type = np.float32 if opts.single else np.float64
+    patience = opts.patience * n
+    n_memory = opts.n_memory
     
     # check that uounds are valid
     if np.any(v_ub < v_lb):
         print('Error: v_ub cannot be less than v_lb for any variable')
-        return v_init, (np.sqrt(5)-1)/2, np.array([1.0]), None, 0, 0
+        return OrsResult(v_init, (np.sqrt(5)-1)/2, np.array([1.0]), None, 0, 0)
     
     # initialize
     function_evals = iteration = 0
     cvg_f = 1.0
-    cvg_hst = np.full((n + 5, max_evals), np.nan)
+    cvg_hst = [] # list of convergence history records, one per iteration
     f = np.zeros(4)
     
     feasible = converged = stalled = False # convergence criteria
@@ -144,7 +291,11 @@ def ors(func, v_init, v_lb=None, v_ub=None, options=None, consts=None):
     
     # analyze the initial guess
     u0 = u_init.copy() # use .copy() to keep changes in u0 from changing u_init
-    f0, g0, u0, c0, nAvg = avg_cov_func(func, u0, s0, s1, options, consts, BOX)
+    if batch:
+        F, G, U, C, nAvg = avg_cov_func_batched(func, u0[None,:], s0, s1, options, consts, BOX)
+        f0, g0, u0, c0 = F[0], G[0], U[0], C[0]
+    else:
+        f0, g0, u0, c0, nAvg = avg_cov_func(func, u0, s0, s1, options, consts, BOX)
     function_evals += nAvg
     
     # check dimensions
@@ -163,114 +314,161 @@ def ors(func, v_init, v_lb=None, v_ub=None, options=None, consts=None):
     if msg:
         start_time = time.time()
 
-    # plot objective surface
+    # plot objective surface ... one design at a time, also for a batched func
     if msg > 2:
+        if batch:
+            def plot_func(v, consts):
+                F, G = func(v[None, :], consts)
+                return np.asarray(F).flatten()[0], np.atleast_2d(G)[0]
+        else:
+            plot_func = func
         f_min, f_max, ax = plot_opt_surface(
-            func, v_init, v_lb, v_ub, options, consts, 1003)
+            plot_func, v_init, v_lb, v_ub, options, consts, 1003)
      
     # initialize optimal values
     f_opt = f[0]
-    u_opt = u0.copy() # use .copy() to keep changes in u0 from changing u_opt
-    g_opt = g0.copy() # use .copy() to keep changes in g0 from changing g_opt
-    v_opt = s0 + s1*u_opt # scale (u) back to original units (v)
+    g_opt = g0        # g0 is always a new array, never changed in place 
+    v_opt = s0 + s1*u0 # scale (u) back to original units (v)
+    max_g = np.max(g_opt) # the largest constraint, updated with g_opt
     
     # save the initial guess to the convergence history
-    cvg_hst[:, iteration] = np.concatenate([
-        s0 + s1*u_opt, [f_opt], [np.max(g_opt)], 
+    cvg_hst.append(np.concatenate([
+        v_opt, [f_opt], [max_g], 
         [function_evals], [step_stdev], [1.0]
-    ])
+    ]))
+    # the most recent iteration, for cvg_metrics ... v_prev and v_opt are
+    # two buffers that trade places at each improvement
+    v_prev, f_prev = v_opt.copy(), f_opt
     
     if msg:
         print()  # clear screen effect
     
     last_update = function_evals
+    n_idle = 0          # searches since the last update or restart
+    restarted = False   # the step size was restarted since the last update
+
+    # standard normal perturbations are drawn in blocks of rows of R ...
+    # the generator is seeded from np.random, so np.random.seed() repeats a run
+    # any direction is a search direction, so R and r may be single precision,
+    # while the trial points u stay in double precision
+    rng = np.random.default_rng(np.random.randint(2**31))
+    R = rng.standard_normal((min(1024, max_evals), n), dtype=r_type)
+
+    # optionally, the first (up to 256) directions are a scrambled Sobol
+    # sequence, mapped to standard normals, which covers the directions
+    # more evenly than independent draws in the first iterations 
+    n_sobol = min(256, max_evals // 4)
+    if opts.sobol and n_sobol > 0:
+        from scipy.stats.qmc import Sobol
+        from scipy.special import ndtri
+        m_sobol = int(np.log2(n_sobol))   # a power of 2 keeps the balance
+        q = Sobol(d=n, scramble=True, seed=rng).random_base2(m_sobol)
+        R[:2**m_sobol] = ndtri(np.clip(q, 1e-12, 1.0 - 1e-12))
+    i_R = 0
+
+    # buffers for the random step, its direction, and the trial points ...
+    # rows of U_trial, so that u1 and both double-steps are one batch 
+    r  = np.empty(n, dtype=r_type)
+    r1 = np.empty(n)
+    U_trial = np.empty((4, n))
+    u1_trial, u2_trial, u2_back, u3_trial = U_trial
+
+    # memory of the most recent probes and their objectives
+    mem_u = np.empty((n_memory, n))
+    mem_f = np.empty(n_memory)
+    i_mem = 0
+
+    # successes (improvements) of the most recent n_window iterations
+    n_window = n_window * n
+    success = np.zeros(n_window, dtype=bool)
+    i_success = 0
     
     # ========== main optimization loop ==========
     while function_evals < max_evals:
         
         # a random search perturbation with standard deviation 'step_stdev'
-        r = step_stdev * np.random.randn(n)
-        r1 = r / norm(r) # unit vector along r
-        
+        if i_R == R.shape[0]:         # refill the block of random draws
+            rng.standard_normal(dtype=r_type, out=R)
+            i_R = 0
+        np.multiply(R[i_R], step_stdev, out=r)
+        i_R += 1
+
         # 1st perturbation: +1*r : "random single step"
-        aa, _ = box_constraint(u0, r) # keep u1 within bounds
-        u1 = u0 + aa * r
-        d1 = norm(u1 - u0) 
-        
-        f[1], g1, u1, c1, nAvg = avg_cov_func(func, u1, s0, s1, options, consts, BOX)
-        function_evals += nAvg
-        
-        # is f[1] downhill from f[0]?
-        downhill = np.sign(f[0] - f[1]) # +1: yes, -1: no
-        
-        # 2nd perturbation: 2*downhill*r : "downhill double-step"
-        aa, bb = box_constraint(u0, 2*d1*r1) # keep u2 within bounds
-        if downhill > 0:
-            u2 = u0 + aa * 2*d1*r1
+        d1 = _step_1(u0, r, r1, u1_trial)
+
+        if batch: 
+            # evaluate u1 together with both candidates for the double-step,
+            # and keep the one in the direction that turns out to be downhill
+            d2_fwd  = _step_2(u0, r1, d1, +1.0, u2_trial)
+            d2_back = _step_2(u0, r1, d1, -1.0, u2_back)
+            F, G, U, C, nAvg = avg_cov_func_batched(func, U_trial[0:3], s0, s1, options, consts, BOX)
+            function_evals += 3*nAvg
+
+            f[1], g1, u1, c1 = F[0], G[0], U[0], C[0]
+            if f[1] < f[0]:
+                downhill, d2, k = +1.0, d2_fwd, 1
+            else:
+                downhill, d2, k = -1.0, d2_back, 2
+            f[2], g2, u2, c2 = F[k], G[k], U[k], C[k]
+            u2_other, f2_other = U[3-k], F[3-k] # paid for, so it is remembered
         else:
-            u2 = u0 + bb * 2*d1*r1 * downhill
-        d2 = norm(u2 - u0) * downhill 
+            f[1], g1, u1, c1, nAvg = avg_cov_func(func, u1_trial, s0, s1, options, consts, BOX)
+            function_evals += nAvg
 
-        f[2], g2, u2, c2, nAvg = avg_cov_func(func, u2, s0, s1, options, consts, BOX)
-        function_evals += nAvg
-        
-        # 3rd perturbation : try quadratic update if curvature is positive
-        # signed distances from (u0 to u1) and from (u0 to u2) for quadratic fit
-        
-        # fit quadratic: f(d) = c[0] + c[1]*d + c[2]*d^2 
-        D = np.array([
-            [1,  0,     0 ],
-            [1, d1, d1**2 ],
-            [1, d2, d2**2 ]
-        ]) + regularization
-        
-        c = solve(D, f[0:3])
-        
+            # 2nd perturbation: 2*downhill*r : "downhill double-step"
+            downhill = np.sign(f[0] - f[1]) # +1: f[1] is downhill, -1: it is not
+            d2 = _step_2(u0, r1, d1, downhill, u2_trial)
+
+            f[2], g2, u2, c2, nAvg = avg_cov_func(func, u2_trial, s0, s1, options, consts, BOX)
+            function_evals += nAvg
+
+        # 3rd perturbation : the minimum of a quadratic fit along r1, in bounds
         quad_update = False
-        if c[2] > 0:            # positive curvature ... so look for a minimum
-            d3 = -c[1]/(2*c[2]) # d3 = distance from u0 to the zero-slope point
-            aa, bb = box_constraint(u0, d3*r1) # keep u3 within bounds
-            if d3 > 0:
-                u3 = u0 + aa * d3*r1
+        quad_eval = _step_3(u0, r1, d1, d2, f,
+                            mem_u, mem_f, min(i_mem, n_memory), u3_trial)
+        if quad_eval:
+            if batch:
+                F, G, U, C, nAvg = avg_cov_func_batched(func, U_trial[3:4], s0, s1, options, consts, BOX)
+                f[3], g3, u3, c3 = F[0], G[0], U[0], C[0]
             else:
-                u3 = u0 + bb * d3*r1 * downhill
-            
-            f[3], g3, u3, c3, nAvg = avg_cov_func(func, u3, s0, s1, options, consts, BOX)
+                f[3], g3, u3, c3, nAvg = avg_cov_func(func, u3_trial, s0, s1, options, consts, BOX)
             function_evals += nAvg
 
-        # save function values and variable values in their original units 
-        f0 , v0 = f[0] , s0 + s1*u0 
-        f1 , v1 = f[1] , s0 + s1*u1 
-        f2 , v2 = f[2] , s0 + s1*u2 
-        f3 , v3 = f[3] , s0 + s1*u3 
-
-        # find the best (min(f)) objective value of the 4 evaluations in f
-        i_min = np.argmin(f)
-
-        # adaptive update to the step size standard deviation 
-        if i_min > 0: # one or more of u1, u2, u3 is a better point
-            step_txt = '          none'
-            FA = (f2-f0)/(f1-f0)
-            FB = (f0-f2)/(f1-f0)
-            FC = (f2-f1)/(f0-f1)
-            FD = (f1-f2)/(f0-f1)
-            if f1 > f0:                 # step 1 is uphill
-                if FA > 1:              # (f2-f0) > (f1-f0) reduce step
-                    step_stdev /= FA
-                    step_txt = '        uphill reduction'
-                if FB > 1:              # (f0-f2) > (f1-f0) extend step
-                    step_stdev *= FB
-                    step_txt = '        uphill extension'
-            if f1 < f0:                 # step 1 is downhill
-                if FC > 1:              # (f2-f1) > (f0-f1) reduce step
-                    step_stdev /= FC
-                    step_txt = '      downhill reduction'
-                if FD > 1:              # (f1-f2) > (f0-f1) extend step
-                    step_stdev *= FD
-                    step_txt = '      downhill extension'
-        else: # u1, u2, and u3 are all worse points
-            step_stdev *= 0.8
-            step_txt = '             contraction'
+        # remember the new probes for the quadratic fits of later iterations
+        if n_memory > 0:
+            probes = [ (u1, f[1]), (u2, f[2]) ]
+            if batch:
+                probes.append((u2_other, f2_other))
+            if quad_eval:
+                probes.append((u3, f[3]))
+            for u_k, f_k in probes:
+                mem_u[i_mem % n_memory] = u_k
+                mem_f[i_mem % n_memory] = f_k
+                i_mem += 1
+
+        # save function values and variable values in original units for plots
+        if msg > 2:
+            f0 , v0 = f[0] , s0 + s1*u0 
+            f1 , v1 = f[1] , s0 + s1*u1 
+            f2 , v2 = f[2] , s0 + s1*u2 
+            f3 , v3 = f[3] , s0 + s1*u3 
+
+        # find the best (min(f)) of the 4 evaluations in f and
+        # adapt the step size standard deviation
+        i_min, step_stdev, step_case = _step_size(f, step_stdev, tol_v)
+
+        # Rechenberg's 1/5 success rule ... every n iterations, extend the step 
+        # if more than 1/5 of the last n_window iterations improved, else reduce
+        if n_window > 0:
+            success[i_success % n_window] = i_min > 0
+            i_success += 1
+            if i_success >= n_window and i_success % n == 0:
+                p_success = np.count_nonzero(success) / n_window
+                if p_success > 0.2:
+                    step_stdev *= 1.22
+                elif p_success < 0.2:
+                    step_stdev *= 0.85
+                step_stdev = min(max(step_stdev, 2*tol_v), 0.2) # bound the step size
 
         '''
         # scripted update to the step size (alternative to adaptive update)
@@ -278,7 +476,6 @@ def ors(func, v_init, v_lb=None, v_ub=None, options=None, consts=None):
         if i_min > 0:
             step_stdev = step_stdev * (1 - function_evals / max_evals) ** nu
         '''
-        step_stdev = min(max(step_stdev,2*tol_v),0.2) # bound the step size
 
         # update the best point out of the four trials
         if i_min == 1:
@@ -289,65 +486,42 @@ def ors(func, v_init, v_lb=None, v_ub=None, options=None, consts=None):
             u0, g0, c0 = u3, g3, c3
             quad_update = True
         
-        u0 = np.clip(u0, -1.0, +1.0)  # keep u0 within bounds, just to be sure
+        np.clip(u0, -1.0, +1.0, out=u0) # keep u0 within bounds, just to be sure
         f[0] = f[i_min]
         
         # update optimal solution if improved
         if f[0] < f_opt:
-            # use .copy() to keep changes to u0 from changing u_opt!
-            u_opt = u0.copy()
-            f_opt = f[0].copy() # .copy() not needed since f_opt is immutable
-            g_opt = g0.copy()
-            v_opt = s0 + s1*u_opt # scale (u) back to original units (v)
+            v_prev, v_opt = v_opt, v_prev
+            f_prev = f_opt
+            np.multiply(s1, u0, out=v_opt) # scale (u) back to original units (v)
+            v_opt += s0
+            f_opt = f[0]
+            g_opt = g0
             
             # Convergence metrics
-            cvg_v, cvg_f, max_g = cvg_metrics(cvg_hst, v_opt, f_opt, g_opt, iteration)
+            cvg_v, cvg_f, max_g = cvg_metrics(v_prev, f_prev, v_opt, f_opt, g_opt)
 
             iteration += 1
-            cvg_hst[:, iteration] = np.concatenate([
+            cvg_hst.append(np.concatenate([
                 v_opt, [f_opt], [max_g], [function_evals], [cvg_v], [cvg_f]
-            ])
+            ]))
             last_update = function_evals
+            n_idle = 0
+            restarted = False
             
-            # Display progress for this iteration
-            if msg:
-                elapsed = time.time() - start_time
-                secs_left = int((max_evals - function_evals) * elapsed / function_evals)
-                eta = (datetime.now() + timedelta(seconds=secs_left)).strftime('%H:%M:%S')
-                
-                idx_max_g = np.argmax(g_opt) # the index of the largest constraint
-                
-                #print('\033[H\033[J', end='')  # clear screen
-                print('\n +-+-+-+-+-+-+-+-+-+-+- ORS -+-+-+-+-+-+-+-+-+-+-+-+-+')
-                print(f' iteration               = {iteration:5d}', end='')
-                if max_g > tol_g:
-                    print('     !!! infeasible !!!')
-                else:
-                    print('     ***  feasible  ***')
-                print(f' function evaluations    = {function_evals:5d}  of  {max_evals:5d}  '
-                      f'({100*function_evals/max_evals:4.1f}%)')
-                print(f' e.t.a.                  = {eta}')
-                if n < 15:
-                    print(f' variables               = ', end='')
-                    for val in v_opt:
-                        print(f'{val:11.3e}', end='')
-                print()
-                print(f' objective               = {f_opt:11.3e}')
-                print(f" constraint              = {np.max(g_opt):11.4e}    tol_g = {tol_g:8.6f}")
-                print(f' variable  convergence   = {cvg_v:11.4e}    tol_v = {tol_v:8.6f}')
-                print(f' objective convergence   = {cvg_f:11.4e}    tol_f = {tol_f:8.6f}')
-                print(f' c.o.v. of F_A           = {c0:11.3e}')
-                print(f' step std.dev            = {step_stdev:7.3f}{step_txt}')
-                print(' +-+-+-+-+-+-+-+-+-+-+- ORS -+-+-+-+-+-+-+-+-+-+-+-+-+')
-                if quad_update:
-                    print(' successful quadratic update')
+            # Display progress for this iteration ... every 16th at msg = 1
+            if msg > 1 or (msg and iteration % 16 == 1):
+                _print_progress(iteration, function_evals, max_evals, start_time,
+                                v_opt, f_opt, max_g, cvg_v, cvg_f, c0,
+                                step_stdev, STEP_TXT[step_case], quad_update,
+                                tol_v, tol_f, tol_g)
         
             # plot on surface for this iteration
             if msg > 2:
            
                 plt.figure(1003)
-                ii = int(options[10])
-                jj = int(options[11])
+                ii = opts.plot_i
+                jj = opts.plot_j
             
                 if downhill > 0:
                     plt.plot([ v0[ii], v1[ii], v2[ii] ], 
@@ -366,7 +540,7 @@ def ors(func, v_init, v_lb=None, v_ub=None, options=None, consts=None):
 
         # ----- Termination checks -----
         # check for feasibility of constraints 
-        if np.max(g_opt) < tol_g and find_feas:                   # :)
+        if max_g < tol_g and find_feas:                           # :)
             feasible = True
         # check for convergence in variables and objective 
         if iteration > n*n and (cvg_v < tol_v and cvg_f < tol_f): # :)
@@ -374,20 +548,38 @@ def ors(func, v_init, v_lb=None, v_ub=None, options=None, consts=None):
         # check for stalled computations
         if function_evals - last_update > 0.20*max_evals:         # :(
             stalled = True   
+        # out of patience ... restart the search at the largest step size, 
+        # from fresh directions and probes, once, before giving up ... 
+        # counted in searches, not evaluations, so it does not depend on m_max
+        n_idle += 1
+        if patience > 0 and n_idle > patience:
+            if restarted:                                         # :(
+                stalled = True
+            else:
+                step_stdev = 0.200
+                i_R = R.shape[0]    # a fresh block of random directions
+                i_mem = 0           # forget the probes of the quadratic fits
+                success[:] = False
+                i_success = 0
+                n_idle = 0
+                restarted = True
+                if msg > 1:
+                    print(' * no improvement in %d searches ... restart'
+                          ' the step size' % int(patience))
 
         if stalled or (step_stdev <= 2*tol_v and (feasible or converged)):
             break 
 
     # ========== main optimization loop ==========
 
-    # trim the convergence history
-    cvg_hst = cvg_hst[:, 0:iteration+1]
+    # the convergence history as an array, one column per iteration
+    cvg_hst = np.stack(cvg_hst, axis=1)
 
     # plot the converged point
     if msg > 2:
         plt.figure(1003)
-        ii = int(options[10])
-        jj = int(options[11])
+        ii = opts.plot_i
+        jj = opts.plot_j
         plt.plot( v_opt[ii], v_opt[jj], f_opt, '-or', markersize=14 )
         plt.draw()
         plt.pause(0.10)
@@ -400,9 +592,45 @@ def ors(func, v_init, v_lb=None, v_ub=None, options=None, consts=None):
                    lambda_qp, start_time, function_evals, max_evals, 
                    find_feas, feasible, converged, stalled )
 
-    return v_opt, f_opt, g_opt, cvg_hst, iteration, function_evals
+    return OrsResult(v_opt, f_opt, g_opt, cvg_hst, iteration, function_evals)
 
-def cvg_metrics(cvg_hst, v, f, g, iteration ):
+def _print_progress(iteration, function_evals, max_evals, start_time,
+                    v_opt, f_opt, max_g, cvg_v, cvg_f, c0,
+                    step_stdev, step_txt, quad_update, tol_v, tol_f, tol_g):
+    '''
+    Display the progress of ors at an improved iteration
+    '''
+    elapsed = time.time() - start_time
+    secs_left = int((max_evals - function_evals) * elapsed / function_evals)
+    eta = (datetime.now() + timedelta(seconds=secs_left)).strftime('%H:%M:%S')
+    
+    #print('\033[H\033[J', end='')  # clear screen
+    print('\n +-+-+-+-+-+-+-+-+-+-+- ORS -+-+-+-+-+-+-+-+-+-+-+-+-+')
+    print(f' iteration               = {iteration:5d}', end='')
+    if max_g > tol_g:
+        print('     !!! infeasible !!!')
+    else:
+        print('     ***  feasible  ***')
+    print(f' function evaluations    = {function_evals:5d}  of  {max_evals:5d}  '
+          f'({100*function_evals/max_evals:4.1f}%)')
+    print(f' e.t.a.                  = {eta}')
+    if len(v_opt) < 15:
+        print(f' variables               = ', end='')
+        for val in v_opt:
+            print(f'{val:11.3e}', end='')
+    print()
+    print(f' objective               = {f_opt:11.3e}')
+    print(f" constraint              = {max_g:11.4e}    tol_g = {tol_g:8.6f}")
+    print(f' variable  convergence   = {cvg_v:11.4e}    tol_v = {tol_v:8.6f}')
+    print(f' objective convergence   = {cvg_f:11.4e}    tol_f = {tol_f:8.6f}')
+    print(f' c.o.v. of F_A           = {c0:11.3e}')
+    print(f' step std.dev            = {step_stdev:7.3f}{step_txt}')
+    print(' +-+-+-+-+-+-+-+-+-+-+- ORS -+-+-+-+-+-+-+-+-+-+-+-+-+')
+    if quad_update:
+        print(' successful quadratic update')
+
+
+def cvg_metrics(v_prev, f_prev, v, f, g):
     '''
     Compute convergence metrics for ors which are defined as: 
     the ratio of (the difference between the current variables and the most recent iteration variables)
@@ -411,16 +639,16 @@ def cvg_metrics(cvg_hst, v, f, g, iteration ):
     
     Parameters
     ----------    
-    cvg_hst ndarray
-       convergence history 
+    v_prev array
+       design variables of the most recent iteration
+    f_prev float
+       objective function of the most recent iteration
     v array
        design variables
     f float
        objective function
     g array
        constraints 
-    iteration int
-       current iteration number 
 
     Returns
     -------
@@ -435,11 +663,273 @@ def cvg_metrics(cvg_hst, v, f, g, iteration ):
     from numpy.linalg import norm
     from numpy import max
 
-    n = len(v) # number of design variabls 
-
-    cvg_v = 2 * norm(cvg_hst[0:n, iteration] - v) / (norm(cvg_hst[0:n, iteration] + v)+1e-9)
-    cvg_f = 2 * norm(cvg_hst[  n, iteration] - f) / (norm(cvg_hst[  n, iteration] + f)+1e-9)
+    cvg_v = 2 * norm(v_prev - v) / (norm(v_prev + v)+1e-9)
+    cvg_f = 2 * abs(f_prev - f) / (abs(f_prev + f)+1e-9)
     max_g = max(g)     
 
     return cvg_v, cvg_f, max_g
 
+
+
+# ---------------------------------------------------------------------------
+# compiled step helpers for the main loop of ors() 
+# Everything between two calls to func happens in one of these helpers, so 
+# for a cheap func the loop is not dominated by Python and NumPy overhead on
+# tiny n-vectors.
+# error_model='numpy' keeps numpy semantics for x/0 (inf or nan, no exception)
+# ---------------------------------------------------------------------------
+
+@njit(cache=True, error_model='numpy')
+def _box_constraint(u, r):
+    '''
+    Box constraint scaling factors (aa, bb), the same as utl.box_constraint(),
+    such that  -1 <= u + aa*r <= +1  and  -1 <= u - bb*r <= +1.
+    Each of the n regularized n-by-n solves in utl.box_constraint() has only
+    one non-trivial equation, so each factor is a ratio ... 
+    aa_i = (1 - u_i)/(r_i - 1e-6)   and   bb_i = (1 + u_i)/(r_i - 1e-6)  if r_i > 1e-6
+    aa_i = (1 + u_i)/(1e-6 - r_i)   and   bb_i = (1 - u_i)/(1e-6 - r_i)  otherwise
+    The face is chosen by the direction of r_i, not by the sign of a ratio,
+    so u_i = +1 and u_i = -1 are mirror images, with aa_i = 0 on the face ahead.
+
+    Parameters
+    ----------
+    u : ndarray (n,)
+        current point in scaled variables ... -1 <= u <= +1
+    r : ndarray (n,)
+        perturbation vector
+
+    Returns
+    -------
+    aa : float
+        maximum feasible positive step size  ( 0 <= aa <= 1 )
+    bb : float
+        maximum feasible negative step size  ( 0 <= bb <= 1 )
+    '''
+    aa = 1.0
+    bb = 1.0
+    for i in range(u.shape[0]):
+        den = 1e-6 - r[i]
+        if den < 0:         # u + aa*r meets the upper face, u - bb*r the lower
+            aa_i = (1.0 - u[i]) / -den
+            bb_i = (1.0 + u[i]) / -den
+        else:               # u + aa*r meets the lower face, u - bb*r the upper
+            aa_i = (1.0 + u[i]) / den
+            bb_i = (1.0 - u[i]) / den
+        aa = min(aa, aa_i)
+        bb = min(bb, bb_i)
+    return aa, bb
+
+
+@njit(cache=True, error_model='numpy')
+def _step_1(u0, r, r1, u1):
+    '''
+    1st perturbation: +1*r : "random single step", kept within bounds
+    writes the unit vector along r into r1 and the perturbed point into u1,
+    and returns the distance d1 from u0 to u1
+    '''
+    norm_r = norm(r)
+    np.divide(r, norm_r, r1)       # unit vector along r
+    aa, _ = _box_constraint(u0, r) # keep u1 within bounds
+    np.multiply(r, aa, u1)
+    u1 += u0
+    d1 = abs(aa) * norm_r          # = norm(u1 - u0)
+    return d1
+
+
+@njit(cache=True, error_model='numpy')
+def _step_2(u0, r1, d1, downhill, u2):
+    '''
+    2nd perturbation: 2*downhill*r : "downhill double-step", kept within bounds
+    writes the perturbed point into u2 and returns the signed distance d2
+    from u0 to u2, where downhill = sign(f0 - f1)  ( +1: f1 is downhill, -1: not )
+    '''
+    np.multiply(r1, 2*d1, u2)
+    aa, bb = _box_constraint(u0, u2) # keep u2 within bounds
+    if downhill > 0:
+        scale = aa
+    else:
+        scale = bb * downhill
+    u2 *= scale
+    u2 += u0
+    d2 = abs(scale) * 2*d1 * downhill # = norm(u2 - u0) * downhill, |r1| = 1
+    return d2
+
+
+@njit(cache=True, error_model='numpy')
+def _step_3(u0, r1, d1, d2, f, mem_u, mem_f, n_mem, u3):
+    '''
+    3rd perturbation: the minimum, on the feasible segment of the line 
+    u0 + d*r1, of the quadratic through (0,f[0]), (d1,f[1]), (d2,f[2]).
+    Remembered probes near the line along r1 refine the fit (_quad_fit).
+    With positive curvature this is the zero-slope point, clamped to the
+    segment.  Without it, this is the lower end of the segment within twice
+    the span of the samples, if the quadratic predicts an improvement there.
+    Writes the point into u3 and returns True, or returns False, and u3 is 
+    not to be evaluated, if there is no such point or no feasible segment,
+    if the three distances are not distinct (no quadratic model), or if u3
+    would repeat u0, u1 or u2.
+    '''
+    tiny = 1e-12
+    # d1 = 0 where u0 is on a face of the box, upper or lower, and r points out
+    if abs(d1) < tiny or abs(d2) < tiny or abs(d2 - d1) < tiny:
+        return False
+
+    # fit quadratic: f(d) = c0 + c1*d + c2*d^2 
+    c0, c1, c2 = _quad_fit(u0, r1, d1, d2, f, mem_u, mem_f, n_mem)
+
+    # the feasible segment  d_lo <= d <= d_hi  of u0 + d*r1 within the box ... 
+    # no segment within the box is longer than the diagonal of the box, L
+    L = 2.0 * np.sqrt(u0.shape[0])
+    np.multiply(r1, L, u3)
+    aa, bb = _box_constraint(u0, u3)
+    d_lo = -bb * L
+    d_hi =  aa * L
+    if not d_lo <= d_hi:
+        return False        # no feasible segment
+
+    if c2 > 0:              # positive curvature ... so look for a minimum
+        d3 = -c1/(2*c2)     # d3 = distance from u0 to the zero-slope point
+        d3 = min(max(d3, d_lo), d_hi)
+    else:                   # no minimum ... try the lower end of the segment
+        span = 2.0 * max(abs(d1), abs(d2))
+        d_lo = max(d_lo, -span)
+        d_hi = min(d_hi,  span)
+        f_lo = c0 + c1*d_lo + c2*d_lo**2
+        f_hi = c0 + c1*d_hi + c2*d_hi**2
+        if f_lo < f_hi:
+            d3, f3 = d_lo, f_lo
+        else:
+            d3, f3 = d_hi, f_hi
+        if not f3 < min(f[0], min(f[1], f[2])):
+            return False    # no improvement is predicted
+
+    if abs(d3) < tiny or abs(d3 - d1) < tiny or abs(d3 - d2) < tiny:
+        return False        # u3 would repeat u0, u1 or u2
+    np.multiply(r1, d3, u3)
+    u3 += u0
+    return True
+
+
+@njit(cache=True, error_model='numpy')
+def _quad_fit(u0, r1, d1, d2, f, mem_u, mem_f, n_mem):
+    '''
+    Coefficients of the quadratic f(d) = c0 + c1*d + c2*d^2 along the line
+    u0 + d*r1, fit to (0,f[0]), (d1,f[1]), (d2,f[2]) and to those of the first
+    n_mem remembered probes (mem_u, mem_f) that lie near the line ... within
+    a 0.6 degree cone about it and within the span of the current samples.
+    (Probes farther off the line, in a curved valley, flatten the fit.)
+    A remembered probe enters the fit at its projection d = (u - u0)'r1.
+    If no remembered probe is near the line, or if the least squares system
+    is ill-conditioned, this is the three-point fit of _solve3().
+    '''
+    d_max = 2.0 * max(abs(d1), abs(d2))
+    M = np.empty((3 + n_mem, 3))
+    y = np.empty(3 + n_mem)
+    k = 3
+    for j in range(n_mem):
+        w = mem_u[j] - u0
+        d = np.dot(w, r1)                # distance along the line
+        rho2 = np.dot(w, w) - d*d        # squared distance from the line
+        if 1e-12 < abs(d) <= d_max and rho2 <= 1e-4*d*d:
+            M[k, 0] = 1.0
+            M[k, 1] = d
+            M[k, 2] = d*d
+            y[k] = mem_f[j]
+            k += 1
+
+    if k > 3:
+        M[0, 0], M[0, 1], M[0, 2] = 1.0, 0.0, 0.0
+        M[1, 0], M[1, 1], M[1, 2] = 1.0, d1, d1*d1
+        M[2, 0], M[2, 1], M[2, 2] = 1.0, d2, d2*d2
+        y[0], y[1], y[2] = f[0], f[1], f[2]
+        if np.linalg.cond(M[:k]) < 1e10:
+            c = np.linalg.lstsq(M[:k], y[:k], 1e-9)[0]
+            return c[0], c[1], c[2]
+
+    return _solve3(d1, d2, f[0], f[1], f[2])
+
+
+@njit(cache=True, error_model='numpy')
+def _solve3(d1, d2, f0, f1, f2):
+    '''
+    Coefficients of the quadratic f(d) = c0 + c1*d + c2*d^2 through the points
+    (0,f0), (d1,f1), (d2,f2), from the regularized 3-by-3 system 
+        [ 1+e  0     0      ] [c0]   [f0]
+        [ 1    d1+e  d1^2   ] [c1] = [f1]     with  e = 1e-6
+        [ 1    d2    d2^2+e ] [c2]   [f2]
+    by Cramer's rule, computed from its scalar entries.
+    Falls back to np.linalg.solve() if the determinant is lost to round-off.
+    '''
+    e = 1e-6
+    a11 = 1.0 + e
+    a22 = d1 + e
+    a23 = d1*d1
+    a32 = d2
+    a33 = d2*d2 + e
+
+    # the first row is (a11, 0, 0) so det = a11 * det( [a22 a23 ; a32 a33] )
+    det = a22*a33 - a23*a32
+    if abs(det) <= 1e-14 * (abs(a22*a33) + abs(a23*a32)):
+        D = np.array([ [ a11, 0.0, 0.0 ],
+                       [ 1.0, a22, a23 ],
+                       [ 1.0, a32, a33 ] ])
+        c = np.linalg.solve(D, np.array([f0, f1, f2]))
+        return c[0], c[1], c[2]
+
+    c0 = f0 / a11
+    b2 = f1 - c0
+    b3 = f2 - c0
+    c1 = (b2*a33 - a23*b3) / det
+    c2 = (a22*b3 - b2*a32) / det
+    return c0, c1, c2
+
+
+@njit(cache=True, error_model='numpy')
+def _step_size(f, step_stdev, tol_v):
+    '''
+    Find the best of the four evaluations in f and adapt the standard 
+    deviation of the random step to the success of the perturbations.
+    returns the index of the best point, the bounded step_stdev,
+    and the index of the step update description in STEP_TXT
+    '''
+    f0, f1, f2 = f[0], f[1], f[2]
+
+    # the index of the first smallest of the four values in f
+    i_min = 0
+    f_min = f0
+    if f1 < f_min:
+        i_min = 1
+        f_min = f1
+    if f2 < f_min:
+        i_min = 2
+        f_min = f2
+    if f[3] < f_min:
+        i_min = 3
+    
+    if i_min > 0: # one or more of u1, u2, u3 is a better point
+        step_case = 0
+        FA = (f2-f0)/(f1-f0)
+        FB = (f0-f2)/(f1-f0)
+        FC = (f2-f1)/(f0-f1)
+        FD = (f1-f2)/(f0-f1)
+        if f1 > f0:                 # step 1 is uphill
+            if FA > 1:              # (f2-f0) > (f1-f0) reduce step
+                step_stdev /= FA
+                step_case = 1
+            if FB > 1:              # (f0-f2) > (f1-f0) extend step
+                step_stdev *= FB
+                step_case = 2
+        if f1 < f0:                 # step 1 is downhill
+            if FC > 1:              # (f2-f1) > (f0-f1) reduce step
+                step_stdev /= FC
+                step_case = 3
+            if FD > 1:              # (f1-f2) > (f0-f1) extend step
+                step_stdev *= FD
+                step_case = 4
+    else: # u1, u2, and u3 are all worse points
+        step_stdev *= 0.8
+        step_case = 5
+
+    step_stdev = min(max(step_stdev, 2*tol_v), 0.2) # bound the step size
+
+    return i_min, step_stdev, step_case
@@ -0,0 +1,123 @@
+"""
+ors_multistart.py
+-----------------------------------------------------------------------------
+Independent restarts of the Optimized Random Search, run in parallel
+Depends on: ors()
+-----------------------------------------------------------------------------
+
+ors is a stochastic single-start method.  Restarting it from several initial
+guesses, each with its own random stream, is embarrassingly parallel, so the
+restarts run in separate processes, one per core, and the best one is kept.
+"""
+
+import os
+import pickle
+import numpy as np
+from dataclasses import replace
+from concurrent.futures import ProcessPoolExecutor
+
+from multivarious.opt.ors import ors, OrsOptions
+
+
+def ors_multistart(func, v_init, v_lb=None, v_ub=None, options=None, consts=None,
+                   n_starts=None, n_workers=None):
+    """
+    Run n_starts independent ors optimizations in parallel and keep the best.
+
+    Parameters
+    ----------
+    func : callable
+        Function to optimize with signature: f, g = func(v, consts) (see ors)
+        To run in parallel, func and consts must be picklable, i.e., defined
+        at the top level of a module (not a lambda or a nested function).
+        Otherwise the starts run one after the other, in this process.
+        Where worker processes are spawned (the default on macOS and
+        Windows), they re-import the calling script, so a script that calls
+        ors_multistart, and defines func, needs an
+        if __name__ == '__main__':  guard around this call.
+    v_init : ndarray, shape (n,) or (n_starts, n)
+        Initial design variable values, one row per start.  If one initial
+        guess is given, it is the first start, and the other starts begin
+        from points drawn uniformly between v_lb and v_ub.
+    v_lb, v_ub : ndarray, shape (n,), optional
+        Lower and upper bounds on design variables (default: -/+ 100*|v_init|)
+    options : ndarray, list, or OrsOptions, optional
+        Optimization settings, as for ors.  Each start runs quietly (msg = 0).
+    consts : optional
+        Additional constants passed to func(v, consts)
+    n_starts : int, optional
+        Number of starts (default: the number of rows of v_init, if more
+        than one, or else the number of cores)
+    n_workers : int, optional
+        Number of worker processes (default: the number of cores)
+
+    Returns
+    -------
+    best : OrsResult
+        The ors result of the start with the smallest f_opt
+    results : list of OrsResult
+        The ors results of all the starts, in order
+    """
+
+    v_init = np.atleast_2d(np.asarray(v_init, dtype=float))
+    n = v_init.shape[1]
+    n_cores = os.cpu_count() or 1
+
+    if n_starts is None:
+        n_starts = v_init.shape[0] if v_init.shape[0] > 1 else n_cores
+    if n_workers is None:
+        n_workers = n_cores
+
+    if v_lb is None:
+        v_lb = -1.0e2 * np.abs(v_init[0])
+    if v_ub is None:
+        v_ub = 1.0e2 * np.abs(v_init[0])
+    v_lb = np.asarray(v_lb, dtype=float).flatten()
+    v_ub = np.asarray(v_ub, dtype=float).flatten()
+
+    # the initial guess of each start
+    if v_init.shape[0] < n_starts:
+        v_rand = v_lb + np.random.rand(n_starts - v_init.shape[0], n)*(v_ub - v_lb)
+        v_init = np.vstack((v_init, v_rand))
+    v_init = v_init[:n_starts]
+
+    # quiet starts ... printing and plotting from parallel processes interleave
+    if not isinstance(options, OrsOptions):
+        options = OrsOptions.from_options(options)
+    opts = replace(options, msg=0)
+
+    # a separate random stream for each start, seeded from np.random
+    seeds = np.random.randint(2**31, size=n_starts)
+
+    starts = [ (func, v_init[k], v_lb, v_ub, opts, consts, seeds[k])
+               for k in range(n_starts) ]
+
+    parallel = n_workers > 1 and n_starts > 1
+    if parallel:
+        try:
+            pickle.dumps((func, consts))
+        except (pickle.PicklingError, AttributeError, TypeError):
+            print('WARNING: func or consts can not be sent to worker processes,'
+                  ' running the starts one after the other')
+            parallel = False
+
+    if parallel:
+        with ProcessPoolExecutor(max_workers=min(n_workers, n_starts)) as pool:
+            results = list(pool.map(_ors_start, starts))
+    else:
+        results = [ _ors_start(start) for start in starts ]
+
+    f_opts = [ result.f_opt for result in results ]
+    best = results[int(np.argmin(f_opts))]
+
+    return best, results
+
+
+def _ors_start(start):
+    '''
+    one start of ors_multistart ... a top level function, so that it can be
+    sent to a worker process
+    '''
+    func, v_init, v_lb, v_ub, opts, consts, seed = start
+    np.random.seed(seed)
+    return ors(func, v_init, v_lb, v_ub, opts, consts)
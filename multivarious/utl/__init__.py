@@ -15,6 +15,7 @@ module filename (case-sensitive). Re-export all of them here so users may call:
 # multivarious/utl/__init__.py
 
 from .avg_cov_func import avg_cov_func
+from .avg_cov_func_batched import avg_cov_func_batched
 from .box_constraint import box_constraint
 from .correlated_rvs import correlated_rvs
 from .format_bank import format_bank
@@ -31,6 +32,7 @@ from .L1_plots import L1_plots
 
 
 __all__ = [ "avg_cov_func", 
+            "avg_cov_func_batched", 
             "box_constraint", 
             "correlated_rvs",
             "format_bank", 
@@ -53,13 +53,13 @@ def avg_cov_func(func, u, s0, s1, options, consts=None, BOX=1):
     avg_g = 0.0
     m = 0
 
-    u = np.asarray(u, dtype=float).flatten()
+    u = _as_1d_f64(u, copy=not BOX)      # np.clip() makes the copy if BOX
     if BOX:
         u = np.clip(u, -1.0, 1.0)
 
     for m in range(1, m_max + 1):
         f, g = func(s0+s1*u, consts)             # objective, constraints
-        g = np.asarray(g, dtype=float).flatten()       # constraints as a vector
+        g = _as_1d_f64(g)                              # constraints as a vector
         F_A = f + penalty * np.sum(g * (g > tol_g))**q # augmented objective
 
         # Welford's recursive update of a mean and a standard deviation 
@@ -84,6 +84,16 @@ def avg_cov_func(func, u, s0, s1, options, consts=None, BOX=1):
 
     return F_risk, avg_g, u, cov_F, m
 
+
+def _as_1d_f64(a, copy=True):
+    """
+    a as a 1-D float64 array, converted in a single pass.
+    With copy=True the result is always a new array, as with .flatten().
+    With copy=False a contiguous 1-D float64 array is returned without a copy.
+    """
+    a = np.array(a, dtype=np.float64) if copy else np.asarray(a, dtype=np.float64)
+    return a.ravel()
+
 """
 Welford, B. P. (1962).
 "Note on a method for calculating corrected sums of squares and products".
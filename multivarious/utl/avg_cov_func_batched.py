@@ -0,0 +1,85 @@
+# avg_cov_func_batched.py
+# -----------------------------------------------------------------------------
+# Batched sibling of avg_cov_func.py for functions that accept a batch of
+# design variables, one design per row, and evaluate it in a single call.
+# Computes the risk-adjusted (penalized) average cost and coefficient of
+# variation of each row.
+# -----------------------------------------------------------------------------
+
+import numpy as np
+
+def avg_cov_func_batched(func, U, s0, s1, options, consts=None, BOX=1):
+    """
+    Compute the average and coefficient of variation of a penalized cost
+    function for a batch of B designs, with one call to func per sample.
+
+    Parameters
+    ----------
+    func : callable
+        Batched function to optimize: F, G = func(V, consts), where
+        V is (B,n), F is (B,) and G is (B,m), one row per design
+    U : np.ndarray (B,n)
+        Scaled design variables, one design per row ( -1 < U < +1 )
+    s0, s1 : np.ndarray or float
+        Linear scaling factors mapping [v_lb, v_ub] -> [-1, +1]
+    options : np.ndarray
+        Optimization settings vector (see opt_options)
+    consts : np.ndarray, optional
+        Additional constants (non-design variables)
+    BOX : int, optional
+        1 to bound U within [-1, 1], 0 to allow unbounded (default=1)
+
+    Returns
+    -------
+    F_risk : np.ndarray (B,)
+        Risk-adjusted average cost of each design (84th percentile of F)
+    avg_g : np.ndarray (B,m)
+        Average constraint vector of each design
+    U : np.ndarray (B,n)
+        Possibly bounded U (if BOX=1)
+    cov_F : np.ndarray (B,)
+        Coefficient of variation of F of each design
+    m : int
+        Number of evaluations used for each design ... B*m in all
+    """
+
+    tol_g   = options[3]
+    penalty = options[5]
+    q       = options[6]
+    m_max   = int(options[7])
+    err_F   = options[8]
+    Za2     = 1.645  # 90% confidence level
+
+    U = np.atleast_2d(np.asarray(U, dtype=float))
+    if BOX:
+        U = np.clip(U, -1.0, 1.0)
+    B = U.shape[0]
+
+    avg_F = np.zeros(B)    # mean of F
+    ssq_F = np.zeros(B)    # sum square values for F
+    cov_F = np.zeros(B)    # coefficient of variation for F
+    avg_g = 0.0
+    m = 0
+
+    for m in range(1, m_max + 1):
+        F, G = func(s0+s1*U, consts)                    # objectives, constraints
+        F = np.asarray(F, dtype=float).reshape(B)
+        G = np.array(G, dtype=float).reshape(B, -1)     # constraints as rows
+        F_A = F + penalty * np.sum(G * (G > tol_g), axis=1)**q # augmented objectives
+
+        # Welford's recursive update of a mean and a standard deviation
+        dF = F_A - avg_F
+        avg_F += dF / m                 # update the means of F
+        ssq_F += dF * (F_A - avg_F)     # update the sums of squares of F
+        avg_g = avg_g + (G - avg_g) / m if m>1 else G  # update average constraints
+
+        if m > 1:
+            cov_F = np.sqrt(ssq_F / (m - 1)) / np.abs(avg_F) # update the c.o.v.'s of F
+            if m > 2 and np.all(m > (Za2 * cov_F / err_F)**2):
+                break
+
+    F_risk = avg_F
+    if m > 1:
+        F_risk = avg_F * ( 1 + cov_F )  # 84th percentile of F, as in avg_cov_func
+
+    return F_risk, avg_g, U, cov_F, m
@@ -40,7 +40,12 @@ def opt_options(options_in=None):
         2,       # [15] penalty type
         1e-6,    # [16] min param. change for finite diff gradients
         1e-1,    # [17] max param. change for finite diff gradients
-        0        # [18] number of equality constraints
+        0,       # [18] number of equality constraints
+        0,       # [19] func evaluates a batch of designs, one per row (ors)
+        0,       # [20] random search directions in single precision (ors)
+        0,       # [21] Sobol search directions in the first iterations (ors)
+        10,      # [22] patience: searches without improvement / n (0: off) (ors)
+        0        # [23] past probes kept for the quadratic fits (ors)
     ], dtype=float)
 
     # Initialize
@@ -60,5 +65,9 @@ def opt_options(options_in=None):
     options[7] = max(options[7], 1)
     options[8] = abs(options[8])
     options[9] = abs(options[9])
+    options[19] = 1 if options[19] else 0
+    options[20] = 1 if options[20] else 0
+    options[21] = 1 if options[21] else 0
+    options[23] = round(options[23])
 
     return options